@@ -1,20 +1,36 @@
 # agent_coordinator.py - Enhanced version with comprehensive session management - FIXED
 
 import os
+import copy
 import logging
+from dataclasses import dataclass, field
 from datetime import datetime
-from .document_collector import DocumentCollectorAgent
+from .document_collector import DocumentCollectorAgent, find_session_uploads
 from .compliance_checker import ComplianceCheckerAgent
 from .standard_retriever import StandardRetrieverAgent
 from .report_generator import ReportGeneratorAgent
 from .qa_agent import QAAgent
 
+@dataclass
+class ParsedDoc:
+    """Text extracted from an uploaded document, shared by every step that needs it"""
+    filepath: str
+    text: str
+    file_type: str
+    char_count: int
+    word_count: int
+    mtime: float
+    parsed_at: datetime = field(default_factory=datetime.now)
+
+
 class AgentCoordinator:
     """Enhanced Agent Coordinator with robust session management and QA integration - FIXED"""
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.sessions = {}  # Track active sessions
+        self._parsed_docs = {}  # session_id -> ParsedDoc, so an upload is extracted only once
+        self._restored_sessions = set()  # sessions whose QA context was already restored from self.sessions
         self.agents = {
             'document_collector': None,
             'compliance_checker': None,
@@ -91,8 +107,38 @@ class AgentCoordinator:
             'recommendations': []
         }
     
+    def parse_document_once(self, session_id: str, filepath: str) -> ParsedDoc:
+        """Extract an uploaded document once per session; raises ValueError if extraction fails"""
+        mtime = os.path.getmtime(filepath)
+        parsed = self._parsed_docs.get(session_id)
+        if parsed is not None and parsed.filepath == filepath and parsed.mtime == mtime:
+            return parsed
+        
+        document_result = self.agents['document_collector'].process(filepath)
+        if not document_result.get('success'):
+            raise ValueError(document_result.get('error', 'Unknown error'))
+        
+        parsed = ParsedDoc(
+            filepath=filepath,
+            text=document_result.get('text', ''),
+            file_type=document_result.get('file_type', ''),
+            char_count=document_result.get('char_count', 0),
+            word_count=document_result.get('word_count', 0),
+            mtime=mtime
+        )
+        self._parsed_docs[session_id] = parsed
+        return parsed
+
     def process_compliance_analysis(self, session_id: str, selected_standards: list):
         """Enhanced compliance analysis dengan QA context sync yang diperbaiki - FIXED VERSION"""
+        result = None
+        for event in self.process_compliance_analysis_iter(session_id, selected_standards):
+            result = event.get('result', result)
+        return result
+
+    def process_compliance_analysis_iter(self, session_id: str, selected_standards: list):
+        """Same pipeline as process_compliance_analysis, yielding a progress event per stage.
+        The last event is 'complete' or 'error' and carries the full result dict."""
         try:
             self.logger.info(f"🔍 Starting Enhanced Compliance Analysis for session {session_id}")
             self.logger.info(f"📋 Selected Standards: {selected_standards}")
@@ -100,58 +146,65 @@ class AgentCoordinator:
             # Step 1: Validate and find uploaded file
             upload_folder = 'uploads'
             if not os.path.exists(upload_folder):
-                return {
+                yield {'stage': 'error', 'result': {
                     'success': False,
                     'error': 'Upload directory tidak ditemukan',
                     'step': 'directory_validation'
-                }
+                }}
+                return
             
-            uploaded_files = [f for f in os.listdir(upload_folder) if f.startswith(session_id)]
+            uploaded_paths = find_session_uploads(session_id, upload_folder)
+            uploaded_files = [os.path.basename(path) for path in uploaded_paths]
             if not uploaded_files:
-                return {
+                yield {'stage': 'error', 'result': {
                     'success': False,
                     'error': f"Tidak ada file yang diupload untuk session {session_id}",
                     'step': 'file_validation',
                     'available_files': os.listdir(upload_folder)[:5]  # Show some available files for debugging
-                }
+                }}
+                return
             
-            filepath = os.path.join(upload_folder, uploaded_files[0])
+            filepath = uploaded_paths[0]
             self.logger.info(f"📁 Processing file: {uploaded_files[0]} ({os.path.getsize(filepath)} bytes)")
 
             # Step 2: Enhanced standards validation
             validation_result = self.validate_standards_selection(selected_standards)
             if not validation_result.get('valid'):
                 self.logger.error(f"❌ Standards validation failed: {validation_result.get('error')}")
-                return {
+                yield {'stage': 'error', 'result': {
                     'success': False,
                     'error': validation_result.get('error'),
                     'step': 'standards_validation',
                     'recommendations': validation_result.get('recommendations', [])
-                }
+                }}
+                return
 
             # Step 3: Document collection and processing
             self.logger.info("📄 Processing document...")
-            document_result = self.agents['document_collector'].process(filepath)
-            
-            if not document_result.get('success'):
-                self.logger.error(f"❌ Document processing failed: {document_result.get('error')}")
-                return {
+            try:
+                parsed_doc = self.parse_document_once(session_id, filepath)
+            except ValueError as parse_error:
+                self.logger.error(f"❌ Document processing failed: {str(parse_error)}")
+                yield {'stage': 'error', 'result': {
                     'success': False,
-                    'error': f"Gagal memproses dokumen: {document_result.get('error', 'Unknown error')}",
+                    'error': f"Gagal memproses dokumen: {str(parse_error)}",
                     'step': 'document_processing'
-                }
+                }}
+                return
             
-            document_text = document_result.get('text', '')
+            document_text = parsed_doc.text
             if not document_text or len(document_text.strip()) < 100:
                 self.logger.error("❌ Document text too short or empty")
-                return {
+                yield {'stage': 'error', 'result': {
                     'success': False,
                     'error': 'Teks dokumen terlalu pendek atau kosong. Pastikan dokumen berisi konten yang cukup untuk dianalisis.',
                     'step': 'document_content_validation',
                     'document_length': len(document_text)
-                }
+                }}
+                return
             
             self.logger.info(f"✅ Document processed: {len(document_text):,} characters")
+            yield {'stage': 'document_processed', 'document_length': len(document_text)}
 
             # Step 4: Load and validate standards
             self.logger.info("📚 Loading selected standards...")
@@ -164,11 +217,14 @@ class AgentCoordinator:
                 
             except Exception as standards_error:
                 self.logger.error(f"❌ Standards loading error: {str(standards_error)}")
-                return {
+                yield {'stage': 'error', 'result': {
                     'success': False,
                     'error': f"Gagal memuat standar: {str(standards_error)}",
                     'step': 'standards_loading'
-                }
+                }}
+                return
+            
+            yield {'stage': 'standards_loaded', 'chunks': standards_loaded}
 
             # Step 5: Perform comprehensive compliance analysis
             self.logger.info("🔍 Performing compliance analysis...")
@@ -176,11 +232,12 @@ class AgentCoordinator:
             
             if not compliance_result.get('success'):
                 self.logger.error(f"❌ Compliance analysis failed: {compliance_result.get('error')}")
-                return {
+                yield {'stage': 'error', 'result': {
                     'success': False,
                     'error': f"Analisis compliance gagal: {compliance_result.get('error', 'Unknown error')}",
                     'step': 'compliance_analysis'
-                }
+                }}
+                return
             
             analysis = compliance_result.get('analysis', {})
             compliance_score = analysis.get('compliance_score', 0)
@@ -191,6 +248,12 @@ class AgentCoordinator:
             self.logger.info(f"   📊 Score: {compliance_score}%")
             self.logger.info(f"   ⚠️ Issues: {issues_count}")
             self.logger.info(f"   ✅ Compliant: {compliant_count}")
+            yield {
+                'stage': 'compliance_scored',
+                'compliance_score': compliance_score,
+                'total_issues': issues_count,
+                'compliant_items': compliant_count
+            }
 
             # Step 6: CRITICAL FIX - Store QA context immediately and properly
             self.logger.info("💾 Storing QA context - FIXED VERSION...")
@@ -210,10 +273,10 @@ class AgentCoordinator:
                     self.logger.error(f"❌ Failed to store QA context for session {session_id}")
                     
             except Exception as qa_error:
-                self.logger.error(f"❌ QA context storage error: {str(qa_error)}")
-                import traceback
-                self.logger.error(traceback.format_exc())
+                self.logger.exception("❌ QA context storage error: %s", qa_error)
                 qa_store_success = False
+            
+            yield {'stage': 'qa_context_stored', 'qa_ready': qa_store_success}
 
             # Step 7: Generate comprehensive report
             report_result = None
@@ -231,11 +294,13 @@ class AgentCoordinator:
                     self.logger.warning(f"⚠️ Report generation failed: {report_result.get('error') if report_result else 'Unknown error'}")
                     
             except Exception as report_error:
-                self.logger.error(f"❌ Report generation error: {str(report_error)}")
-                import traceback
-                self.logger.error(traceback.format_exc())
+                self.logger.exception("❌ Report generation error: %s", report_error)
+            
+            yield {'stage': 'report_generated', 'report_generated': report_success}
 
             # Step 8: Store comprehensive session data - FIXED VERSION
+            # The session now holds the text; the parse cache entry is no longer needed
+            self._parsed_docs.pop(session_id, None)
             self.sessions[session_id] = {
                 'document_text': document_text,
                 'document_filename': uploaded_files[0],
@@ -281,19 +346,17 @@ class AgentCoordinator:
                 response['pdf_path'] = report_result.get('pdf_path')
             
             self.logger.info(f"🎉 Enhanced compliance analysis completed successfully for session {session_id}")
-            return response
+            yield {'stage': 'complete', 'result': response}
 
         except Exception as e:
-            self.logger.error(f"💥 Coordination error for session {session_id}: {str(e)}")
-            import traceback
-            self.logger.error(traceback.format_exc())
+            self.logger.exception("💥 Coordination error for session %s: %s", session_id, e)
             
-            return {
+            yield {'stage': 'error', 'result': {
                 'success': False,
                 'error': f'Error dalam koordinasi analisis: {str(e)}',
                 'step': 'coordination_error',
                 'session_id': session_id
-            }
+            }}
     
     def process_question(self, session_id: str, question: str):
         """Enhanced question processing dengan fallback dan recovery mechanisms - FIXED VERSION"""
@@ -307,24 +370,9 @@ class AgentCoordinator:
             
             self.logger.info(f"🔍 Session check - Coordinator: {coordinator_has_session}, QA: {qa_has_context}")
             
-            # FIXED: If coordinator has session but QA doesn't, restore QA context
+            # FIXED: If coordinator has session but QA doesn't, restore QA context (once per session)
             if coordinator_has_session and not qa_has_context:
-                self.logger.info("🔄 Restoring QA context from coordinator session...")
-                session_data = self.sessions[session_id]
-                
-                # Restore QA context from coordinator data
-                recovery_success = self.agents['qa_agent'].store_analysis_context(
-                    session_id=session_id,
-                    analysis_result=session_data.get('analysis', {}),
-                    document_text=session_data.get('document_text', ''),
-                    selected_standards=session_data.get('selected_standards', [])
-                )
-                
-                if recovery_success:
-                    self.logger.info("✅ QA context restored successfully from coordinator")
-                    qa_has_context = True
-                else:
-                    self.logger.error("❌ Failed to restore QA context from coordinator")
+                qa_has_context = self.ensure_session_restored(session_id)
             
             # FIXED: If neither has context, try to recover from files
             if not coordinator_has_session and not qa_has_context:
@@ -333,7 +381,7 @@ class AgentCoordinator:
                 # Try to recover from uploaded file
                 upload_folder = 'uploads'
                 if os.path.exists(upload_folder):
-                    uploaded_files = [f for f in os.listdir(upload_folder) if f.startswith(session_id)]
+                    uploaded_files = [os.path.basename(path) for path in find_session_uploads(session_id, upload_folder)]
                     
                     if uploaded_files:
                         self.logger.info(f"📁 Found uploaded file: {uploaded_files[0]} - suggesting re-analysis")
@@ -365,9 +413,7 @@ class AgentCoordinator:
                 return self._generate_context_error_response(session_id, question)
             
         except Exception as e:
-            self.logger.error(f"💥 Question processing error for session {session_id}: {str(e)}")
-            import traceback
-            self.logger.error(traceback.format_exc())
+            self.logger.exception("💥 Question processing error for session %s: %s", session_id, e)
             
             return self._generate_error_response(session_id, question, str(e))
     
@@ -500,6 +546,20 @@ Maaf, terjadi kesalahan dalam memproses pertanyaan Anda.
                 }
             }
     
+    def get_standards_version(self) -> int:
+        """Version of the loaded standards; changes whenever get_available_standards may change"""
+        return self.agents['standard_retriever'].standards_version
+    
+    def get_state_fingerprint(self) -> tuple:
+        """Cheap summary of everything get_agent_status reports (apart from uptime)"""
+        agents_state = tuple(
+            (name, agent.status, len(agent.activity_log), agent.error_count,
+             agent.activity_log[-1]['timestamp'] if agent.activity_log else None)
+            if agent is not None else (name, None)
+            for name, agent in self.agents.items()
+        )
+        return (len(self.sessions), len(self.agents['qa_agent'].analysis_contexts), agents_state)
+    
     def get_session_info(self, session_id: str):
         """Get comprehensive information about a session - FIXED VERSION"""
         try:
@@ -552,13 +612,16 @@ Maaf, terjadi kesalahan dalam memproses pertanyaan Anda.
             else:
                 upload_folder = 'uploads'
                 if os.path.exists(upload_folder):
-                    uploaded_files = [f for f in os.listdir(upload_folder) if f.startswith(session_id)]
+                    uploaded_paths = find_session_uploads(session_id, upload_folder)
+                    uploaded_files = [os.path.basename(path) for path in uploaded_paths]
                     
                     if uploaded_files:
-                        filepath = os.path.join(upload_folder, uploaded_files[0])
+                        filepath = uploaded_paths[0]
                         try:
-                            document_result = self.agents['document_collector'].process(filepath)
-                            document_text = document_result.get('text', '') if document_result.get('success') else ''
+                            try:
+                                document_text = self.parse_document_once(session_id, filepath).text
+                            except ValueError:
+                                document_text = ''
                             
                             return {
                                 'exists': False,
@@ -590,6 +653,41 @@ Maaf, terjadi kesalahan dalam memproses pertanyaan Anda.
                 'qa_available': False
             }
     
+    def ensure_session_restored(self, session_id: str) -> bool:
+        """Make sure the QA agent holds the context of a coordinator session; restores it at most once"""
+        qa_agent = self.agents['qa_agent']
+        if session_id in self._restored_sessions or qa_agent.has_session_context(session_id):
+            return True
+        session_data = self.sessions.get(session_id)
+        if session_data is None:
+            return False
+        
+        self.logger.info("🔄 Restoring QA context for session %s", session_id)
+        restored = qa_agent.store_analysis_context(
+            session_id=session_id,
+            analysis_result=session_data.get('analysis', {}),
+            document_text=session_data.get('document_text', ''),
+            selected_standards=session_data.get('selected_standards', [])
+        )
+        if restored:
+            self._restored_sessions.add(session_id)
+            self.logger.info("✅ QA context restored for session %s", session_id)
+        else:
+            self.logger.error("❌ Failed to restore QA context for session %s", session_id)
+        return restored
+    
+    def clone_session(self, source_id: str, target_id: str) -> bool:
+        """Give target_id its own copy of source_id's analysis (identical document re-uploaded)"""
+        session_data = self.sessions.get(source_id)
+        qa_cloned = self.agents['qa_agent'].clone_session_context(source_id, target_id)
+        if session_data is None:
+            return qa_cloned
+        cloned = copy.deepcopy(session_data)
+        cloned['timestamp'] = datetime.now()
+        self.sessions[target_id] = cloned
+        self.logger.info("♻️ Session %s cloned from %s", target_id, source_id)
+        return True
+    
     def cleanup_old_sessions(self, days_old: int = 7):
         """Enhanced cleanup with comprehensive statistics"""
         try:
@@ -617,10 +715,16 @@ Maaf, terjadi kesalahan dalam memproses pertanyaan Anda.
             for session_id in sessions_to_remove:
                 try:
                     del self.sessions[session_id]
+                    self._restored_sessions.discard(session_id)
                     cleanup_stats['coordinator_sessions_removed'] += 1
                 except Exception as e:
                     cleanup_stats['errors'].append(f"Remove session {session_id}: {str(e)}")
             
+            # Parsed uploads that were never analyzed
+            for session_id, parsed in list(self._parsed_docs.items()):
+                if parsed.parsed_at < cutoff_date:
+                    self._parsed_docs.pop(session_id, None)
+            
             # Cleanup QA agent sessions
             try:
                 cleanup_stats['qa_cleanup_result'] = self.agents['qa_agent'].cleanup_old_sessions(days_old)
@@ -1,8 +1,10 @@
 import os
 import time
 import re
-from groq import Groq
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from .base_agent import BaseAgent
+from .groq_client import get_groq_client
 from .standard_retriever import StandardRetrieverAgent
 
 class ComplianceCheckerAgent(BaseAgent):
@@ -10,10 +12,13 @@ class ComplianceCheckerAgent(BaseAgent):
     
     def __init__(self):
         super().__init__("ComplianceChecker")
-        self.groq_client = Groq(api_key=os.getenv('GROQ_API_KEY'))
+        self.groq_client = get_groq_client()
         self.standard_retriever = StandardRetrieverAgent()
         self.last_api_call = 0
         self.min_delay = 3  # Increased to 3 seconds to avoid rate limiting
+        self._api_slot_lock = threading.Lock()
+        # Aspek dianalisis bersamaan; waktu mulai tiap panggilan Groq tetap diberi jarak min_delay
+        self.max_concurrent_aspects = int(os.getenv('REGUBOT_ASPECT_CONCURRENCY', '4'))
         
         # Flexible compliance framework - akan disesuaikan berdasarkan dokumen
         self.base_compliance_aspects = {
@@ -104,35 +109,16 @@ class ComplianceCheckerAgent(BaseAgent):
             total_weight = 0
             weighted_score = 0
 
-            for aspect_key, aspect_info in relevant_aspects.items():
-                self.log_action("Analyzing relevant aspect", aspect_info['name'])
-
-                # Get relevant standards for this aspect
-                relevant_standards = self.standard_retriever.process(
-                    f"{aspect_info['name']} {' '.join(aspect_info['keywords'])}",
-                    top_k=3,
-                    selected_standards=selected_standards
-                )
-
-                # Only use requirements if found in standards
-                requirements = []
-                for std in relevant_standards.get('standards', []):
-                    req_text = std.get('content', '')
-                    if req_text and len(req_text) > 30:
-                        requirements.append({
-                            'requirement': req_text,
-                            'reference': std.get('article', std.get('source', '')),
-                            'source': std.get('source', ''),
-                            'full_name': std.get('full_name', '')
-                        })
-
-                # Analyze compliance for this aspect
-                compliance_result = self._analyze_aspect_with_context(
-                    document_text, aspect_key, aspect_info,
-                    relevant_standards.get('standards', []),
-                    document_analysis
-                )
+            # Retrieval + LLM call per aspect are independent and network-bound: run them concurrently
+            aspect_items = list(relevant_aspects.items())
+            workers = max(1, min(self.max_concurrent_aspects, len(aspect_items)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                aspect_checks = list(pool.map(
+                    lambda item: self._check_aspect(document_text, item[0], item[1], selected_standards, document_analysis),
+                    aspect_items
+                ))
 
+            for (aspect_key, aspect_info), (relevant_standards, requirements, compliance_result) in zip(aspect_items, aspect_checks):
                 if compliance_result:
                     weight = aspect_info.get('weight', 0.1)
                     total_weight += weight
@@ -189,6 +175,47 @@ class ComplianceCheckerAgent(BaseAgent):
             self.log_action("Analysis error", str(e))
             return {'success': False, 'error': str(e)}
 
+    def _check_aspect(self, document_text: str, aspect_key: str, aspect_info: dict,
+                      selected_standards: list, document_analysis: dict):
+        """Retrieve standards and run the compliance check for one aspect (safe to run concurrently)"""
+        self.log_action("Analyzing relevant aspect", aspect_info['name'])
+
+        # Get relevant standards for this aspect
+        relevant_standards = self.standard_retriever.process(
+            f"{aspect_info['name']} {' '.join(aspect_info['keywords'])}",
+            top_k=3,
+            selected_standards=selected_standards
+        )
+
+        # Only use requirements if found in standards
+        requirements = []
+        for std in relevant_standards.get('standards', []):
+            req_text = std.get('content', '')
+            if req_text and len(req_text) > 30:
+                requirements.append({
+                    'requirement': req_text,
+                    'reference': std.get('article', std.get('source', '')),
+                    'source': std.get('source', ''),
+                    'full_name': std.get('full_name', '')
+                })
+
+        # Analyze compliance for this aspect
+        compliance_result = self._analyze_aspect_with_context(
+            document_text, aspect_key, aspect_info,
+            relevant_standards.get('standards', []),
+            document_analysis
+        )
+        return relevant_standards, requirements, compliance_result
+
+    def _wait_for_api_slot(self):
+        """Space Groq request starts by min_delay; concurrent callers each reserve their own slot"""
+        with self._api_slot_lock:
+            slot = max(time.time(), self.last_api_call + self.min_delay)
+            self.last_api_call = slot
+        delay = slot - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
     def _analyze_document_structure(self, document_text: str) -> dict:
         """Analyze document structure and type to understand context"""
         lines = document_text.split('\n')
@@ -328,11 +355,7 @@ class ComplianceCheckerAgent(BaseAgent):
         """Enhanced analysis dengan konteks dokumen yang lebih baik"""
         try:
             # Rate limiting with exponential backoff
-            current_time = time.time()
-            time_since_last_call = current_time - self.last_api_call
-            if time_since_last_call < self.min_delay:
-                sleep_time = self.min_delay - time_since_last_call
-                time.sleep(sleep_time)
+            self._wait_for_api_slot()
 
             # Extract relevant excerpts with better context
             relevant_excerpts = self._extract_relevant_excerpts_enhanced(document_text, aspect_info)
@@ -386,8 +409,6 @@ Berikan HANYA JSON response:
                     max_tokens=1000
                 )
                 
-                self.last_api_call = time.time()
-                
             except Exception as api_error:
                 if "429" in str(api_error):
                     self.log_action("Rate limit hit, using longer delay", "10 seconds")
@@ -1,4 +1,6 @@
 import os
+import glob
+import fnmatch
 import fitz  # PyMuPDF
 from docx import Document
 import pytesseract
@@ -6,6 +8,26 @@ from PIL import Image
 import io
 from .base_agent import BaseAgent
 
+def find_session_uploads(session_id: str, upload_folder: str = 'uploads') -> list:
+    """Paths of a session's uploads: uploads/<session_id>/*, or legacy flat uploads/<session_id>_* files"""
+    # The id is joined into a path; never let it leave upload_folder
+    if (not session_id or '..' in session_id or os.sep in session_id
+            or (os.altsep and os.altsep in session_id) or os.path.isabs(session_id)):
+        return []
+    try:
+        with os.scandir(os.path.join(upload_folder, session_id)) as entries:
+            return sorted(e.path for e in entries if e.is_file() and not e.name.endswith('.part'))
+    except (FileNotFoundError, NotADirectoryError):
+        pass
+    
+    # Legacy layout: fnmatch.filter matches the whole listing with one compiled pattern
+    try:
+        names = os.listdir(upload_folder)
+    except FileNotFoundError:
+        return []
+    paths = (os.path.join(upload_folder, name) for name in fnmatch.filter(names, f"{glob.escape(session_id)}_*"))
+    return sorted(path for path in paths if os.path.isfile(path))
+
 class DocumentCollectorAgent(BaseAgent):
     """Agent untuk mengumpulkan dan memproses dokumen"""
     
@@ -31,10 +53,10 @@ class DocumentCollectorAgent(BaseAgent):
             # Fix: Jika filepath tidak exist (kemungkinan hanya session_id), rekonstruksi full path
             if not os.path.exists(filepath):
                 self.log_action("Reconstructing filepath", "Input seems to be session_id only")
-                files = [f for f in os.listdir(self.upload_folder) if f.startswith(filepath + '_')]
+                files = find_session_uploads(filepath, self.upload_folder)
                 if not files:
                     raise ValueError(f"File not found for session: {filepath}")
-                filepath = os.path.join(self.upload_folder, files[0])  # Ambil file pertama yang match
+                filepath = files[0]  # Ambil file pertama yang match
                 self.log_action("Reconstructed filepath", filepath)
             
             # Sekarang ekstensi dari filepath yang benar
@@ -0,0 +1,16 @@
+import os
+import functools
+import httpx
+from groq import Groq
+
+# Satu koneksi pool untuk semua panggilan Groq (ComplianceChecker + QA), jadi TCP/TLS dipakai ulang
+GROQ_HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+
+@functools.lru_cache(maxsize=1)
+def get_groq_client():
+    """Get the process-wide Groq client (shared keep-alive pool, SDK retries on 429/5xx)"""
+    return Groq(
+        api_key=os.getenv('GROQ_API_KEY'),
+        http_client=httpx.Client(limits=GROQ_HTTP_LIMITS, timeout=httpx.Timeout(60.0, connect=10.0)),
+        max_retries=2
+    )
@@ -1,7 +1,10 @@
 import os
+import copy
 import json
-from groq import Groq
+import tempfile
+from session_ids import is_valid_session_id
 from .base_agent import BaseAgent
+from .groq_client import get_groq_client
 from .standard_retriever import StandardRetrieverAgent
 from datetime import datetime
 import pickle
@@ -12,7 +15,7 @@ class QAAgent(BaseAgent):
     
     def __init__(self):
         super().__init__("QAAgent")
-        self.groq_client = Groq(api_key=os.getenv('GROQ_API_KEY'))
+        self.groq_client = get_groq_client()
         self.standard_retriever = StandardRetrieverAgent()
         self.conversation_history = {}
         self.analysis_contexts = {}  # Store analysis results by session
@@ -38,20 +41,46 @@ class QAAgent(BaseAgent):
                     filepath = os.path.join(self.session_storage_dir, filename)
                     
                     try:
-                        with open(filepath, 'rb') as f:
-                            session_data = pickle.load(f)
-                            
-                        self.analysis_contexts[session_id] = session_data.get('analysis_context', {})
-                        self.document_contexts[session_id] = session_data.get('document_context', {})
-                        self.conversation_history[session_id] = session_data.get('conversation_history', [])
-                        
-                        self.log_action("Session loaded", f"Session: {session_id}")
+                        self._load_session_file(session_id, filepath)
                     except Exception as e:
                         self.logger.error(f"Failed to load session {session_id}: {str(e)}")
                         
         except Exception as e:
             self.log_action("Session loading error", str(e))
     
+    def _load_session_file(self, session_id: str, filepath: str):
+        """Load one pickled session into memory"""
+        with open(filepath, 'rb') as f:
+            session_data = pickle.load(f)
+            
+        self.analysis_contexts[session_id] = session_data.get('analysis_context', {})
+        self.document_contexts[session_id] = session_data.get('document_context', {})
+        self.conversation_history[session_id] = session_data.get('conversation_history', [])
+        
+        self.log_action("Session loaded", f"Session: {session_id}")
+    
+    def load_session_context(self, session_id: str) -> bool:
+        """Pick up a session stored by another worker process; True if context is available"""
+        if self.has_session_context(session_id):
+            return True
+        # Unpickling runs code, so only ever load our own files from session_storage
+        if not is_valid_session_id(session_id):
+            self.logger.warning("Refusing to load session with malformed id")
+            return False
+        storage_dir = os.path.realpath(self.session_storage_dir)
+        filepath = os.path.realpath(os.path.join(storage_dir, f"{session_id}.pkl"))
+        if os.path.dirname(filepath) != storage_dir:
+            self.logger.warning(f"Refusing to load session file outside storage: {session_id}")
+            return False
+        try:
+            self._load_session_file(session_id, filepath)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            self.logger.error(f"Failed to load session {session_id}: {str(e)}")
+            return False
+        return self.has_session_context(session_id)
+    
     def _save_session_data(self, session_id: str):
         """Save session data to persistent storage"""
         try:
@@ -62,9 +91,17 @@ class QAAgent(BaseAgent):
                 'last_updated': datetime.now().isoformat()
             }
             
+            # Write-then-rename so other workers never read a half-written pickle; mkstemp gives every
+            # concurrent save (threads, greenlets, processes) its own temp file
             filepath = os.path.join(self.session_storage_dir, f"{session_id}.pkl")
-            with open(filepath, 'wb') as f:
-                pickle.dump(session_data, f)
+            fd, tmp_path = tempfile.mkstemp(dir=self.session_storage_dir, prefix=f"{session_id}.", suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(session_data, f)
+                os.replace(tmp_path, filepath)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
                 
             self.log_action("Session saved", f"Session: {session_id}")
             
@@ -167,6 +204,17 @@ class QAAgent(BaseAgent):
                 'error': str(e)
             }
     
+    def clone_session_context(self, source_id: str, target_id: str) -> bool:
+        """Copy a session's analysis/document context to a new session with an empty conversation"""
+        if not self.has_session_context(source_id):
+            return False
+        self.analysis_contexts[target_id] = copy.deepcopy(self.analysis_contexts[source_id])
+        self.document_contexts[target_id] = copy.deepcopy(self.document_contexts[source_id])
+        self.conversation_history[target_id] = []
+        self._save_session_data(target_id)
+        self.log_action("Session context cloned", f"{source_id} -> {target_id}")
+        return True
+    
     def get_conversation_history(self, session_id: str) -> list:
         """Get conversation history for a session"""
         return self.conversation_history.get(session_id, [])
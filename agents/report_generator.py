@@ -56,7 +56,7 @@ class ReportGeneratorAgent(BaseAgent):
 
     def generate_enhanced_docx_report(self, analysis_data: dict, session_id: str) -> str:
         """Generate enhanced DOCX report dengan struktur yang lebih baik"""
-        filename = f"ReguBot_Audit_Report_{session_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
+        filename = f"{session_id}_ReguBot_Audit_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
         filepath = os.path.join(self.reports_dir, filename)
         
         doc = Document()
@@ -94,7 +94,7 @@ class ReportGeneratorAgent(BaseAgent):
 
     def generate_enhanced_pdf_report(self, analysis_data: dict, session_id: str) -> str:
         """Generate enhanced PDF report dengan visualisasi yang lebih baik"""
-        filename = f"compliance_report_{session_id}.pdf"
+        filename = f"{session_id}_compliance_report.pdf"
         filepath = os.path.join(self.reports_dir, filename)
         
         doc = SimpleDocTemplate(filepath, pagesize=A4, leftMargin=0.75*inch, rightMargin=0.75*inch)
@@ -82,7 +82,7 @@ class ReportGeneratorAgent:
             self._add_appendix(doc, compliance_results)
             
             # Save file
-            report_filename = f"ReguBot_Audit_Report_{session_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
+            report_filename = f"{session_id}_ReguBot_Audit_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
             report_path = os.path.join('reports', report_filename)
             doc.save(report_path)
             
@@ -1,4 +1,5 @@
 import os
+import copy
 import json
 import chromadb
 from sentence_transformers import SentenceTransformer
@@ -7,6 +8,10 @@ import shutil
 import tempfile
 import uuid
 import re
+import sys
+import multiprocessing
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from .base_agent import BaseAgent
 
 os.environ['ANONYMIZED_TELEMETRY'] = 'False'
@@ -14,6 +19,35 @@ os.environ['CHROMA_CLIENT_AUTH_PROVIDER'] = ''
 os.environ['CHROMA_SERVER_NOFILE'] = '1'
 os.environ['CHROMA_SERVER_CORS_ALLOW_ORIGINS'] = '[]'
 
+# Paragraph boundary: a blank line, including whitespace-only blank lines
+_PARAGRAPH_BREAK_RE = re.compile(r'\n\s*\n')
+
+# Text cleaning passes for extracted PDF pages
+_WHITESPACE_RE = re.compile(r'\s+')
+_PAGE_NUMBER_RE = re.compile(r'\n\s*\d+\s*\n|\n\s*Page\s+\d+.*?\n', re.IGNORECASE)
+_NOISE_RE = re.compile(r'http[s]?://\S+|\S+@\S+')
+_REPEATED_PUNCT_RE = re.compile(r'([.!?])\1+')
+
+# Below this many PDFs extraction stays serial: every spawned worker re-imports the agent stack
+# (torch, chromadb, ...) and, under `python app.py`, re-runs app.py as __mp_main__, which costs far
+# more than parsing a handful of 15-page PDFs in-process
+PARALLEL_LOAD_MIN_FILES = int(os.getenv('REGUBOT_PARALLEL_LOAD_MIN_FILES', '32'))
+
+# PDF files must carry this header within their first 1024 bytes
+_PDF_MAGIC = b'%PDF-'
+
+# Fuzzy filename hints -> UI standard, for PDFs not listed in standards_mapping
+_FUZZY_STANDARD_RE = re.compile(r'(gdpr|nist|perlindungan_data|pdp|pojk|ojk|bssn)')
+_FUZZY_STANDARD_MAP = {
+    'gdpr': 'GDPR',
+    'nist': 'NIST',
+    'perlindungan_data': 'UU_PDP',
+    'pdp': 'UU_PDP',
+    'pojk': 'POJK',
+    'ojk': 'POJK',
+    'bssn': 'BSSN'
+}
+
 class StandardRetrieverAgent(BaseAgent):
     def process(self, query, top_k=3, selected_standards=None):
         """Process query and return standards, fallback to default if none found"""
@@ -45,8 +79,13 @@ class StandardRetrieverAgent(BaseAgent):
         self.client = None
         self.collection = None
         self.embedding_model = None
+        self.fallback_storage = None  # Created only when ChromaDB is unavailable
         self._standards_loaded = False
         
+        # Cache get_available_standards(); invalidated whenever chunks are added
+        self._standards_version = 0
+        self._available_standards_cache = None
+        
         # Enhanced standards mapping dengan metadata lengkap
         self.standards_mapping = {
             'GDPR': {
@@ -85,6 +124,12 @@ class StandardRetrieverAgent(BaseAgent):
                 'focus_areas': ['keamanan siber', 'sistem elektronik', 'insiden siber', 'audit keamanan']
             }
         }
+        # Lowercased filename -> UI standard, built once for filename lookups
+        self._filename_to_standard = {
+            pdf_file.lower(): ui_standard
+            for ui_standard, standard_info in self.standards_mapping.items()
+            for pdf_file in standard_info['files']
+        }
         
         self._initialize_components()
         
@@ -143,6 +188,7 @@ class StandardRetrieverAgent(BaseAgent):
             'standards_index': {},  # Index by standard type for faster lookup
             'keyword_index': {}     # Keyword index for better search
         }
+        self._standards_version += 1
         self.client = None
         self.collection = None
         self.log_action("Enhanced fallback storage created", "Using improved in-memory storage")
@@ -222,7 +268,7 @@ class StandardRetrieverAgent(BaseAgent):
                     total_items = len(all_items['ids']) if all_items['ids'] else 0
                 except Exception as e:
                     self.log_action("ChromaDB verification failed", str(e))
-            elif hasattr(self, 'fallback_storage'):
+            elif self.fallback_storage is not None:
                 total_items = len(self.fallback_storage['documents'])
             
             self.log_action("Enhanced standards loading completed", 
@@ -240,84 +286,95 @@ class StandardRetrieverAgent(BaseAgent):
     def _load_pdf_standard_enhanced(self, filepath: str, category: str, filename: str, ui_standard: str, standard_info: dict) -> bool:
         """Enhanced PDF loading dengan better text processing"""
         try:
-            doc = fitz.open(filepath)
-            chunks_created = 0
-            # Process more pages for better coverage
-            max_pages = min(doc.page_count, 15)
-            for page_num in range(max_pages):
-                page = doc[page_num]
-                text = page.get_text()
-                # Enhanced text cleaning
-                cleaned_text = self._clean_extracted_text(text)
-                if len(cleaned_text.strip()) > 100:
-                    # Smart chunking based on content structure
-                    chunks = self._create_smart_chunks(cleaned_text, standard_info)
-                    for i, chunk in enumerate(chunks):
-                        if len(chunk.strip()) > 50:  # Only meaningful chunks
-                            chunk_id = f"{filename}_p{page_num+1}_c{i+1}_{self.instance_id}"
-                            # Enhanced metadata
-                            # Extract article/section from chunk
-                            article_match = None
-                            # English: Article/Section
-                            match = re.search(r'(Article|Section)\s*(\d+[A-Za-z]*)', chunk, re.IGNORECASE)
-                            if match:
-                                article_match = f"{match.group(1).capitalize()} {match.group(2)}"
-                            # Indonesian: Pasal
-                            match_id = re.search(r'(Pasal)\s*(\d+[A-Za-z]*)', chunk, re.IGNORECASE)
-                            if match_id:
-                                article_match = f"{match_id.group(1).capitalize()} {match_id.group(2)}"
-                            # If not found, fallback to page
-                            if not article_match:
-                                article_match = f"Page {page_num+1}"
-                            metadata = {
-                                'source': filename,
-                                'category': category,
-                                'page': page_num + 1,
-                                'chunk': i + 1,
-                                'standard_type': self._identify_standard_type(filename),
-                                'ui_standard': ui_standard,
-                                'full_name': standard_info.get('full_name', ''),
-                                'jurisdiction': standard_info.get('jurisdiction', ''),
-                                'focus_areas': ','.join(standard_info.get('focus_areas', [])),
-                                'text_length': len(chunk),
-                                'keywords': self._extract_keywords_from_chunk(chunk),
-                                'section_type': self._identify_section_type(chunk),
-                                'article': article_match
-                            }
-                            # Store in ChromaDB or fallback
-                            if self.collection is not None:
-                                try:
-                                    embedding = self.embedding_model.encode([chunk]).tolist()[0]
-                                    self.collection.add(
-                                        embeddings=[embedding],
-                                        documents=[chunk],
-                                        metadatas=[metadata],
-                                        ids=[chunk_id]
-                                    )
-                                    chunks_created += 1
-                                except Exception as e:
-                                    if "already exists" not in str(e).lower():
-                                        self.log_action("ChromaDB add error", f"{chunk_id}: {str(e)}")
-                            else:
-                                # Enhanced fallback storage
-                                if not hasattr(self, 'fallback_storage'):
-                                    self._create_enhanced_fallback_storage()
-                                self.fallback_storage['documents'].append(chunk)
-                                self.fallback_storage['metadatas'].append(metadata)
-                                self.fallback_storage['ids'].append(chunk_id)
-                                # Update indexes
-                                if ui_standard not in self.fallback_storage['standards_index']:
-                                    self.fallback_storage['standards_index'][ui_standard] = []
-                                self.fallback_storage['standards_index'][ui_standard].append(len(self.fallback_storage['documents']) - 1)
-                                chunks_created += 1
-            doc.close()
+            ids, documents, metadatas = _extract_pdf_chunks(
+                filepath, category, filename, ui_standard,
+                self._identify_standard_type(filename), standard_info, self.instance_id
+            )
+            chunks_created = self._store_chunks(ids, documents, metadatas)
             self.log_action("Enhanced PDF processed", f"{filename}: {chunks_created} chunks created")
             return True
         except Exception as e:
             self.log_action("PDF load error", f"{filename}: {str(e)}")
             return False
+    
+    def _store_chunks(self, ids: list, documents: list, metadatas: list) -> int:
+        """Store extracted chunks in ChromaDB or the fallback storage with one batched write"""
+        if not ids:
+            return 0
+        # Chunks already stored (a re-load of the same standards) are skipped, so they are neither
+        # re-encoded nor counted as a change of the standards version
+        if self.collection is not None:
+            try:
+                existing = set(self.collection.get(ids=ids, include=[])['ids'])
+            except Exception as e:
+                self.log_action("ChromaDB lookup error", str(e))
+                existing = set()
+        elif self.fallback_storage is not None:
+            existing = set(self.fallback_storage['ids']).intersection(ids)
+        else:
+            existing = set()
+        if existing:
+            kept = [i for i, chunk_id in enumerate(ids) if chunk_id not in existing]
+            if not kept:
+                return 0
+            ids = [ids[i] for i in kept]
+            documents = [documents[i] for i in kept]
+            metadatas = [metadatas[i] for i in kept]
         
-    def _extract_keywords_from_chunk(self, chunk: str) -> str:
+        chunks_created = 0
+        if self.collection is not None:
+            embeddings = None
+            try:
+                embeddings = self.embedding_model.encode(documents).tolist()
+                self.collection.add(
+                    embeddings=embeddings,
+                    documents=documents,
+                    metadatas=metadatas,
+                    ids=ids
+                )
+                chunks_created = len(ids)
+            except Exception as e:
+                if "already exists" not in str(e).lower():
+                    self.log_action("ChromaDB add error", f"{len(ids)} chunks, retrying per chunk: {str(e)}")
+                # One bad (or duplicate) chunk must not drop the whole batch
+                chunks_created = self._store_chunks_individually(ids, documents, metadatas, embeddings)
+        else:
+            # Enhanced fallback storage
+            if self.fallback_storage is None:
+                self._create_enhanced_fallback_storage()
+            start = len(self.fallback_storage['documents'])
+            self.fallback_storage['documents'].extend(documents)
+            self.fallback_storage['metadatas'].extend(metadatas)
+            self.fallback_storage['ids'].extend(ids)
+            # Update indexes
+            standards_index = self.fallback_storage['standards_index']
+            for position, metadata in enumerate(metadatas, start):
+                standards_index.setdefault(metadata['ui_standard'], []).append(position)
+            chunks_created = len(ids)
+        if chunks_created:
+            self._standards_version += 1
+        return chunks_created
+    
+    def _store_chunks_individually(self, ids: list, documents: list, metadatas: list, embeddings: list = None) -> int:
+        """Per-chunk ChromaDB writes, used after a batched add failed; returns the chunks stored"""
+        stored = 0
+        for index, chunk_id in enumerate(ids):
+            try:
+                embedding = embeddings[index] if embeddings else self.embedding_model.encode([documents[index]]).tolist()[0]
+                self.collection.add(
+                    embeddings=[embedding],
+                    documents=[documents[index]],
+                    metadatas=[metadatas[index]],
+                    ids=[chunk_id]
+                )
+                stored += 1
+            except Exception as e:
+                if "already exists" not in str(e).lower():
+                    self.log_action("ChromaDB add error", f"{chunk_id}: {str(e)}")
+        return stored
+    
+    @staticmethod
+    def _extract_keywords_from_chunk(chunk: str) -> str:
         """Extract relevant keywords from chunk for better indexing"""
         # Common compliance and regulatory keywords
         important_keywords = [
@@ -333,7 +390,8 @@ class StandardRetrieverAgent(BaseAgent):
         
         return ','.join(found_keywords[:10])  # Limit to 10 keywords
     
-    def _identify_section_type(self, chunk: str) -> str:
+    @staticmethod
+    def _identify_section_type(chunk: str) -> str:
         """Identify the type of section based on content patterns"""
         chunk_lower = chunk.lower()
         
@@ -354,18 +412,20 @@ class StandardRetrieverAgent(BaseAgent):
     
     def _build_enhanced_indexes(self):
         """Build enhanced indexes for better search performance"""
-        if hasattr(self, 'fallback_storage') and self.fallback_storage['documents']:
+        if self.fallback_storage is not None and self.fallback_storage['documents']:
             # Build keyword index
+            keyword_index = self.fallback_storage['keyword_index']
             for i, metadata in enumerate(self.fallback_storage['metadatas']):
                 keywords = metadata.get('keywords', '').split(',')
                 for keyword in keywords:
                     keyword = keyword.strip()
                     if keyword:
-                        if keyword not in self.fallback_storage['keyword_index']:
-                            self.fallback_storage['keyword_index'][keyword] = []
-                        self.fallback_storage['keyword_index'][keyword].append(i)
+                        if keyword not in keyword_index:
+                            keyword_index[keyword] = []
+                        keyword_index[keyword].append(i)
         
-        self.log_action("Enhanced indexes built", f"Keywords: {len(self.fallback_storage.get('keyword_index', {}))}")
+        keyword_count = len(self.fallback_storage['keyword_index']) if self.fallback_storage is not None else 0
+        self.log_action("Enhanced indexes built", f"Keywords: {keyword_count}")
     
     def process(self, query: str, top_k: int = 5, selected_standards: list = None):
         """Enhanced processing dengan better search algorithm"""
@@ -471,7 +531,7 @@ class StandardRetrieverAgent(BaseAgent):
     def _enhanced_fallback_query(self, query: str, top_k: int, selected_standards: list = None):
         """Enhanced fallback query dengan better matching"""
         try:
-            if not hasattr(self, 'fallback_storage') or not self.fallback_storage['documents']:
+            if self.fallback_storage is None or not self.fallback_storage['documents']:
                 return {
                     'success': True,
                     'standards': [],
@@ -606,30 +666,56 @@ class StandardRetrieverAgent(BaseAgent):
         
         try:
             loaded_count = 0
+            tasks = []
+            errors = []
             
             for category in ['Global', 'Nasional']:
                 category_path = os.path.join(standards_dir, category)
-                if not os.path.exists(category_path):
+                if not os.path.isdir(category_path):
                     continue
                 
-                for filename in os.listdir(category_path):
-                    if filename.endswith('.pdf'):
-                        filepath = os.path.join(category_path, filename)
-                        try:
-                            ui_standard = self._get_ui_standard_from_filename(filename)
-                            standard_info = self.standards_mapping.get(ui_standard, {
-                                'full_name': filename.replace('.pdf', ''),
-                                'jurisdiction': 'Unknown',
-                                'focus_areas': []
-                            })
-                            
-                            success = self._load_pdf_standard_enhanced(
-                                filepath, category, filename, ui_standard, standard_info
-                            )
-                            if success:
-                                loaded_count += 1
-                        except Exception as e:
-                            self.log_action("PDF load error", f"{filename}: {str(e)}")
+                with os.scandir(category_path) as entries:
+                    for entry in entries:
+                        filename = entry.name
+                        # Skip hidden/OS junk entries and non-PDFs before the expensive parse
+                        if filename.startswith('.') or not filename.lower().endswith('.pdf') or not entry.is_file():
+                            continue
+                        if not _has_pdf_header(entry.path):
+                            errors.append((filename, "not a PDF file"))
+                            continue
+                        ui_standard = self._get_ui_standard_from_filename(filename)
+                        standard_info = self.standards_mapping.get(ui_standard, {
+                            'full_name': os.path.splitext(filename)[0],
+                            'jurisdiction': 'Unknown',
+                            'focus_areas': []
+                        })
+                        tasks.append((
+                            entry.path, category, filename, ui_standard,
+                            self._identify_standard_type(filename), standard_info, self.instance_id
+                        ))
+            
+            # Parse PDFs in parallel; Chroma is not process-safe so storage stays in this process
+            batches = {}
+            for task, (success, filename, payload) in zip(tasks, self._run_load_tasks(tasks)):
+                if not success:
+                    errors.append((filename, payload))
+                    continue
+                ids, documents, metadatas = payload
+                batch = batches.setdefault(task[1], ([], [], []))
+                batch[0].extend(ids)
+                batch[1].extend(documents)
+                batch[2].extend(metadatas)
+                self.log_action("Enhanced PDF processed", f"{filename}: {len(ids)} chunks extracted")
+                loaded_count += 1
+            
+            # One batched write per category instead of one per chunk
+            for category, (ids, documents, metadatas) in batches.items():
+                chunks_created = self._store_chunks(ids, documents, metadatas)
+                self.log_action("Category chunks stored", f"{category}: {chunks_created} chunks")
+            
+            if errors:
+                self.log_action("PDF load errors", f"{len(errors)} files failed: " +
+                                "; ".join(f"{name}: {message}" for name, message in errors[:10]))
             
             self._standards_loaded = True
             self._build_enhanced_indexes()
@@ -641,32 +727,39 @@ class StandardRetrieverAgent(BaseAgent):
             self._standards_loaded = True
             return 0
     
+    def _run_load_tasks(self, tasks: list) -> list:
+        """Extract PDFs serially, or in worker processes for large standard libraries"""
+        if len(tasks) >= PARALLEL_LOAD_MIN_FILES:
+            try:
+                # spawn, not fork: by now the process runs torch, logging and warmup threads (and may be
+                # gevent-patched), and forking a multithreaded process can deadlock the child
+                with ProcessPoolExecutor(max_workers=min(len(tasks), os.cpu_count() or 1),
+                                         mp_context=multiprocessing.get_context('spawn')) as executor:
+                    return list(executor.map(_load_worker, tasks))
+            except Exception as e:
+                self.log_action("Parallel PDF loading unavailable, using serial", str(e))
+        return [_load_worker(task) for task in tasks]
+    
     def _get_ui_standard_from_filename(self, filename: str) -> str:
         """Get UI standard name from PDF filename with better matching"""
         filename_lower = filename.lower()
         
         # Direct mapping check
-        for ui_standard, standard_info in self.standards_mapping.items():
-            if any(pdf_file.lower() == filename_lower for pdf_file in standard_info['files']):
-                return ui_standard
+        ui_standard = self._filename_to_standard.get(filename_lower)
+        if ui_standard:
+            return ui_standard
         
         # Fuzzy matching for common variations
-        if 'gdpr' in filename_lower:
-            return 'GDPR'
-        elif 'nist' in filename_lower:
-            return 'NIST'
-        elif 'pdp' in filename_lower or 'perlindungan_data' in filename_lower:
-            return 'UU_PDP'
-        elif 'pojk' in filename_lower or 'ojk' in filename_lower:
-            return 'POJK'
-        elif 'bssn' in filename_lower:
-            return 'BSSN'
-        
-        return 'Unknown'
+        match = _FUZZY_STANDARD_RE.search(filename_lower)
+        return _FUZZY_STANDARD_MAP[match.group(1)] if match else 'Unknown'
+    
+    # Standard type is the UI standard name; alias avoids an extra call per lookup
+    _identify_standard_type = _get_ui_standard_from_filename
     
-    def _identify_standard_type(self, filename: str) -> str:
-        """Identify standard type from filename"""
-        return self._get_ui_standard_from_filename(filename)
+    @property
+    def standards_version(self) -> int:
+        """Bumped whenever stored standard chunks change"""
+        return self._standards_version
     
     def get_available_standards(self):
         """Get list of available standards with enhanced metadata"""
@@ -674,56 +767,65 @@ class StandardRetrieverAgent(BaseAgent):
             # Always load standards if not loaded
             if not self._standards_loaded:
                 self._load_standards_if_needed()
-            standards = {}
+            cached = self._available_standards_cache
+            # Callers get their own copy so nobody can mutate the cached summary
+            if cached is not None and cached[0] == self._standards_version:
+                return copy.deepcopy(cached[1])
             if self.collection is not None:
                 all_items = self.collection.get(include=['metadatas'])
-                for metadata in all_items['metadatas']:
-                    std_type = metadata.get('ui_standard', 'Unknown')
-                    category = metadata.get('category', 'Unknown')
-                    if category not in standards:
-                        standards[category] = {}
-                    if std_type not in standards[category]:
-                        standards[category][std_type] = {
-                            'full_name': metadata.get('full_name', std_type),
-                            'jurisdiction': metadata.get('jurisdiction', 'Unknown'),
-                            'focus_areas': metadata.get('focus_areas', '').split(',') if metadata.get('focus_areas') else [],
-                            'chunk_count': 0
-                        }
-                    standards[category][std_type]['chunk_count'] += 1
-            elif hasattr(self, 'fallback_storage'):
-                for metadata in self.fallback_storage['metadatas']:
-                    std_type = metadata.get('ui_standard', 'Unknown')
-                    category = metadata.get('category', 'Unknown')
-                    if category not in standards:
-                        standards[category] = {}
-                    if std_type not in standards[category]:
-                        standards[category][std_type] = {
-                            'full_name': metadata.get('full_name', std_type),
-                            'jurisdiction': metadata.get('jurisdiction', 'Unknown'),
-                            'focus_areas': metadata.get('focus_areas', '').split(',') if metadata.get('focus_areas') else [],
-                            'chunk_count': 0
-                        }
-                    standards[category][std_type]['chunk_count'] += 1
-            return standards
+                standards = self._aggregate_metadatas(all_items['metadatas'])
+            elif self.fallback_storage is not None:
+                standards = self._aggregate_metadatas(self.fallback_storage['metadatas'])
+            else:
+                standards = {}
+            self._available_standards_cache = (self._standards_version, standards)
+            return copy.deepcopy(standards)
         except Exception as e:
             self.log_action("Get enhanced standards error", str(e))
             return {}
     
-    def _clean_extracted_text(self, text: str) -> str:
+    def _aggregate_metadatas(self, metadatas) -> dict:
+        """Group chunk metadata into {category: {ui_standard: info}} with chunk counts"""
+        counts = Counter()
+        info = {}
+        for metadata in metadatas:
+            get = metadata.get
+            key = (get('category', 'Unknown'), get('ui_standard', 'Unknown'))
+            counts[key] += 1
+            if key not in info:
+                std_type = key[1]
+                focus_areas = get('focus_areas')
+                info[key] = {
+                    'full_name': get('full_name', std_type),
+                    'jurisdiction': get('jurisdiction', 'Unknown'),
+                    'focus_areas': focus_areas.split(',') if focus_areas else []
+                }
+        
+        standards = defaultdict(dict)
+        for (category, std_type), chunk_count in counts.items():
+            standards[category][std_type] = dict(info[(category, std_type)], chunk_count=chunk_count)
+        return dict(standards)
+    
+    @staticmethod
+    def _clean_extracted_text(text: str) -> str:
         """Enhanced text cleaning untuk hasil yang lebih baik"""
+        if not text:
+            return ''
+        # Short single-line fragments (page stubs) have nothing worth cleaning
+        if len(text) < 64 and '\n' not in text:
+            return text.strip()
+        
         # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
+        text = _WHITESPACE_RE.sub(' ', text)
         
         # Remove page numbers and headers/footers patterns
-        text = re.sub(r'\n\s*\d+\s*\n', '\n', text)
-        text = re.sub(r'\n\s*Page\s+\d+.*?\n', '\n', text, flags=re.IGNORECASE)
+        text = _PAGE_NUMBER_RE.sub('\n', text)
         
         # Remove URLs and email patterns that might be noise
-        text = re.sub(r'http[s]?://\S+', '', text)
-        text = re.sub(r'\S+@\S+', '', text)
+        text = _NOISE_RE.sub('', text)
         
         # Clean up punctuation
-        text = re.sub(r'([.!?])\1+', r'\1', text)  # Remove repeated punctuation
+        text = _REPEATED_PUNCT_RE.sub(r'\1', text)  # Remove repeated punctuation
         
         # Normalize quotes
         text = text.replace('"', '"').replace('"', '"')
@@ -731,33 +833,136 @@ class StandardRetrieverAgent(BaseAgent):
         
         return text.strip()
     
-    def _create_smart_chunks(self, text: str, standard_info: dict, chunk_size: int = 600) -> list:
+    @staticmethod
+    def _create_smart_chunks(text: str, standard_info: dict, *, chunk_size: int = 600) -> list:
         """Create smart chunks based on content structure"""
-        # Try to split by natural boundaries first
-        paragraphs = [p.strip() for p in text.split('\n\n') if len(p.strip()) > 20]
-        
-        chunks = []
-        current_chunk = ""
+        min_paragraph_len = 20
+        min_chunk_len = 50
+        oversized_len = chunk_size * 2
         
-        for paragraph in paragraphs:
-            # If adding this paragraph would exceed chunk size
-            if len(current_chunk) + len(paragraph) > chunk_size and current_chunk:
-                chunks.append(current_chunk.strip())
-                current_chunk = paragraph
-            else:
-                current_chunk = current_chunk + "\n\n" + paragraph if current_chunk else paragraph
+        # Try to split by natural boundaries first
+        paragraphs = [p for p in (raw.strip() for raw in _PARAGRAPH_BREAK_RE.split(text)) if len(p) > min_paragraph_len]
         
-        # Add the last chunk
-        if current_chunk:
-            chunks.append(current_chunk.strip())
+        # Pack on lengths only, then join each paragraph range once
+        bounds = _pack_chunk_bounds([len(p) for p in paragraphs], chunk_size)
+        chunks = ["\n\n".join(paragraphs[start:end]) for start, end in bounds]
         
         # If no natural paragraphs, fall back to word-based chunking
-        if not chunks or len(chunks) == 1 and len(chunks[0]) > chunk_size * 2:
-            words = text.split()
+        if not chunks or len(chunks) == 1 and len(chunks[0]) > oversized_len:
+            # Size windows by characters so they honour chunk_size like the paragraph path
             chunks = []
-            for i in range(0, len(words), chunk_size // 8):  # Approximate words per chunk
-                chunk = ' '.join(words[i:i + chunk_size // 8])
-                if len(chunk.strip()) > 50:
+            window = []
+            window_len = 0
+            for word in text.split():
+                window.append(word)
+                window_len += len(word) + 1
+                if window_len >= chunk_size:
+                    chunk = ' '.join(window)
+                    if len(chunk) > min_chunk_len:
+                        chunks.append(chunk)
+                    window = []
+                    window_len = 0
+            if window:
+                chunk = ' '.join(window)
+                if len(chunk) > min_chunk_len:
                     chunks.append(chunk)
         
-        return chunks
\ No newline at end of file
+        return chunks
+
+
+def _pack_chunk_bounds(lengths: list, chunk_size: int, sep: int = 2) -> list:
+    """Greedily pack paragraph lengths into (start, end) index ranges of at most chunk_size chars"""
+    bounds = []
+    start = 0
+    buf_len = 0
+    for i, length in enumerate(lengths):
+        # If adding this paragraph would exceed chunk size
+        if i > start and buf_len + length + sep > chunk_size:
+            bounds.append((start, i))
+            start = i
+            buf_len = length
+        else:
+            buf_len += length + (sep if i > start else 0)
+    
+    # Add the last range
+    if start < len(lengths):
+        bounds.append((start, len(lengths)))
+    return bounds
+
+
+def _has_pdf_header(filepath: str) -> bool:
+    """Cheap magic-bytes check so non-PDFs never reach the PDF parser"""
+    try:
+        with open(filepath, 'rb') as f:
+            return _PDF_MAGIC in f.read(1024)
+    except OSError:
+        return False
+
+
+def _extract_pdf_chunks(filepath: str, category: str, filename: str, ui_standard: str,
+                        standard_type: str, standard_info: dict, instance_id: str):
+    """Parse a standard PDF into (ids, documents, metadatas); state-free so it can run in a worker process"""
+    ids, documents, metadatas = [], [], []
+    # Every chunk of a file repeats these values; intern them so chunks share one string each
+    source = sys.intern(filename)
+    category = sys.intern(category)
+    standard_type = sys.intern(standard_type)
+    ui_standard = sys.intern(ui_standard)
+    full_name = sys.intern(standard_info.get('full_name', ''))
+    jurisdiction = sys.intern(standard_info.get('jurisdiction', ''))
+    focus_areas = sys.intern(','.join(standard_info.get('focus_areas', [])))
+    # Open by path: MuPDF pages the file in lazily, so no full-file bytes copy is made here
+    with fitz.open(filepath) as doc:
+        # Process more pages for better coverage
+        max_pages = min(doc.page_count, 15)
+        for page_num in range(max_pages):
+            page = doc[page_num]
+            text = page.get_text()
+            # Enhanced text cleaning
+            cleaned_text = StandardRetrieverAgent._clean_extracted_text(text)
+            if len(cleaned_text.strip()) > 100:
+                # Smart chunking based on content structure
+                chunks = StandardRetrieverAgent._create_smart_chunks(cleaned_text, standard_info)
+                for i, chunk in enumerate(chunks):
+                    if len(chunk.strip()) > 50:  # Only meaningful chunks
+                        chunk_id = f"{filename}_p{page_num+1}_c{i+1}_{instance_id}"
+                        # Extract article/section from chunk
+                        article_match = None
+                        # English: Article/Section
+                        match = re.search(r'(Article|Section)\s*(\d+[A-Za-z]*)', chunk, re.IGNORECASE)
+                        if match:
+                            article_match = f"{match.group(1).capitalize()} {match.group(2)}"
+                        # Indonesian: Pasal
+                        match_id = re.search(r'(Pasal)\s*(\d+[A-Za-z]*)', chunk, re.IGNORECASE)
+                        if match_id:
+                            article_match = f"{match_id.group(1).capitalize()} {match_id.group(2)}"
+                        # If not found, fallback to page
+                        if not article_match:
+                            article_match = f"Page {page_num+1}"
+                        ids.append(chunk_id)
+                        documents.append(chunk)
+                        metadatas.append({
+                            'source': source,
+                            'category': category,
+                            'page': page_num + 1,
+                            'chunk': i + 1,
+                            'standard_type': standard_type,
+                            'ui_standard': ui_standard,
+                            'full_name': full_name,
+                            'jurisdiction': jurisdiction,
+                            'focus_areas': focus_areas,
+                            'text_length': len(chunk),
+                            'keywords': StandardRetrieverAgent._extract_keywords_from_chunk(chunk),
+                            'section_type': StandardRetrieverAgent._identify_section_type(chunk),
+                            'article': article_match
+                        })
+    return ids, documents, metadatas
+
+
+def _load_worker(task: tuple):
+    """ProcessPoolExecutor entry point: returns (success, filename, payload or error message)"""
+    filename = task[2]
+    try:
+        return True, filename, _extract_pdf_chunks(*task)
+    except Exception as e:
+        return False, filename, str(e)
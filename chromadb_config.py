@@ -1,4 +1,5 @@
 import os
+import functools
 import chromadb
 
 os.environ['ANONYMIZED_TELEMETRY'] = 'False'
@@ -6,20 +7,24 @@ os.environ['CHROMA_CLIENT_AUTH_PROVIDER'] = ''
 os.environ['CHROMA_SERVER_NOFILE'] = '1'
 os.environ['CHROMA_SERVER_CORS_ALLOW_ORIGINS'] = '[]'
 
+# Older/newer chromadb releases may not ship the Posthog module; only that case is ignored
 try:
     import chromadb.telemetry.product.posthog
-    chromadb.telemetry.product.posthog.Posthog = lambda *args, **kwargs: None
-except:
+except ImportError:
     pass
+else:
+    chromadb.telemetry.product.posthog.Posthog = lambda *args, **kwargs: None
+
+_SETTINGS = chromadb.config.Settings(
+    anonymized_telemetry=False,
+    allow_reset=True
+)
 
+@functools.lru_cache(maxsize=8)
 def get_chromadb_client(path="vector_db"):
-    """Get ChromaDB client with telemetry disabled"""
+    """Get ChromaDB client with telemetry disabled (one client per path)"""
     try:
-        settings = chromadb.config.Settings(
-            anonymized_telemetry=False,
-            allow_reset=True
-        )
-        return chromadb.PersistentClient(path=path, settings=settings)
+        return chromadb.PersistentClient(path=path, settings=_SETTINGS)
     except Exception as e:
         # Fallback without settings if there's an issue
         return chromadb.PersistentClient(path=path)
@@ -0,0 +1,28 @@
+# gunicorn_conf.py - Production server settings for ReguBot
+# Jalankan dengan: gunicorn -c gunicorn_conf.py app:app
+
+import os
+
+bind = os.getenv('REGUBOT_BIND', '0.0.0.0:5000')
+
+# Endpoint utama (upload, analyze, chat, download) didominasi I/O (Groq API, file, ChromaDB),
+# jadi satu worker gevent dapat melayani banyak request secara bersamaan
+worker_class = 'gevent'
+worker_connections = 1000
+
+# Konteks QA disimpan di session_storage/ dan dimuat ulang oleh worker mana pun saat chat,
+# tetapi session coordinator (download ulang, status lengkap) masih di memori proses.
+# Default 1 worker; naikkan hanya jika semua worker berbagi direktori kerja yang sama.
+workers = int(os.getenv('REGUBOT_WORKERS', '1'))
+
+# Analisis compliance menjalankan beberapa panggilan LLM berurutan
+timeout = int(os.getenv('REGUBOT_TIMEOUT', '300'))
+
+# Jangan preload: setiap worker mengimpor stack agent (ChromaDB, model embedding) setelah fork,
+# lalu memanaskannya di background agar worker langsung bisa melayani /api/health
+preload_app = False
+
+def post_worker_init(worker):
+    from app import start_coordinator_warmup, start_session_purger
+    start_coordinator_warmup()
+    start_session_purger()
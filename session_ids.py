@@ -0,0 +1,11 @@
+# session_ids.py - Format of ReguBot session ids, shared by app.py and the agents
+# Kept outside the agents package so app.py can import it without loading the agent stack
+
+import re
+
+# token_hex(16) ids, plus uuid4 ids of sessions created before the switch
+SESSION_ID_RE = re.compile(r'[0-9a-f]{32}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+
+def is_valid_session_id(session_id) -> bool:
+    """Only ids minted by /api/upload (token_hex, or legacy uuid4) - never anything path-like"""
+    return isinstance(session_id, str) and SESSION_ID_RE.fullmatch(session_id) is not None